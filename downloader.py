@@ -0,0 +1,234 @@
+"""Shared RSS parsing and async download helpers for the episode downloaders."""
+
+import os
+import re
+import asyncio
+import xml.etree.ElementTree as ET
+from io import BytesIO
+from pathlib import Path
+
+import aiohttp
+
+from speedups import json_dumps, json_loads
+
+RSS_URL = "https://anchor.fm/s/174cb1b8/podcast/rss"
+EPISODES_DIR = Path("episodes")
+METADATA_FILE = Path("episodes_metadata.json")
+# HTTP validators per episode URL ({url: {etag, last_modified, size}}) for resumed GETs
+STATE_FILE = EPISODES_DIR / "download_state.json"
+# Last parsed feed and its validators ({etag, last_modified, episodes}) for conditional GETs
+FEED_CACHE_FILE = EPISODES_DIR / "feed_cache.json"
+
+# Download concurrency: one shared keep-alive pool to anchor.fm's CDN
+MAX_CONCURRENT_DOWNLOADS = 8
+CHUNK_SIZE = 1 << 16
+
+_RE_NONWORD = re.compile(r'[^\w\s-]')
+_RE_WS = re.compile(r'\s+')
+_RE_EPNUM = re.compile(r'#(\d+)')
+
+def clean_filename(title: str) -> str:
+    """Create a clean filename from episode title."""
+    # Remove special chars, keep alphanumeric and spaces
+    clean = _RE_NONWORD.sub('', title)
+    clean = _RE_WS.sub('-', clean.strip())
+    return clean[:80].lower()
+
+def parse_rss(xml_content: bytes) -> list:
+    """Parse RSS feed and extract episode info."""
+    episodes = []
+    
+    ns = {
+        'itunes': 'http://www.itunes.com/dtds/podcast-1.0.dtd',
+        'content': 'http://purl.org/rss/1.0/modules/content/'
+    }
+    
+    # Stream items instead of building the whole tree; each processed <item>
+    # is cleared and detached from <channel> so memory stays flat.
+    channel = None
+    for event, elem in ET.iterparse(BytesIO(xml_content), events=('start', 'end')):
+        if event == 'start':
+            if elem.tag == 'channel':
+                channel = elem
+            continue
+        if elem.tag != 'item':
+            continue
+        
+        title = elem.findtext('title', '')
+        
+        # Get episode number from title if present
+        ep_match = _RE_EPNUM.search(title)
+        ep_num = ep_match.group(1) if ep_match else None
+        
+        enclosure = elem.find('enclosure')
+        audio_url = enclosure.get('url') if enclosure is not None else None
+        
+        guid = elem.findtext('guid')
+        pub_date = elem.findtext('pubDate', '')
+        duration = elem.findtext('itunes:duration', '', ns)
+        description = elem.findtext('description', '')
+        
+        episodes.append({
+            'title': title,
+            'episode_number': ep_num,
+            'audio_url': audio_url,
+            'guid': guid,
+            'pub_date': pub_date,
+            'duration': duration,
+            'description': description[:500] + '...' if len(description) > 500 else description,
+        })
+        
+        elem.clear()
+        if channel is not None:
+            channel.remove(elem)
+    
+    return episodes
+
+def _read_json(path: Path) -> dict:
+    if path.exists():
+        return json_loads(path.read_bytes())
+    return {}
+
+def _write_json(path: Path, data: dict):
+    # Via a temp file so a kill can't corrupt it
+    tmp = path.with_suffix('.tmp')
+    tmp.write_bytes(json_dumps(data))
+    os.replace(tmp, path)
+
+def load_state() -> dict:
+    """Load cached HTTP validators."""
+    state = _read_json(STATE_FILE)
+    # Older state files also held the whole parsed feed; that now lives in FEED_CACHE_FILE
+    state.pop(RSS_URL, None)
+    return state
+
+def save_state(state: dict):
+    """Save cached HTTP validators."""
+    _write_json(STATE_FILE, state)
+
+def validators(resp: aiohttp.ClientResponse) -> dict:
+    """Extract ETag/Last-Modified and full content size from a response."""
+    size = None
+    if resp.status == 206:
+        # Content-Range: bytes <start>-<end>/<total>
+        total = resp.headers.get('Content-Range', '').rpartition('/')[2]
+        size = int(total) if total.isdigit() else None
+    elif resp.content_length is not None:
+        size = resp.content_length
+    return {
+        'etag': resp.headers.get('ETag'),
+        'last_modified': resp.headers.get('Last-Modified'),
+        'size': size,
+    }
+
+def episode_path(ep: dict, index: int) -> Path:
+    """Local MP3 path for an episode."""
+    ep_num = ep['episode_number'] or f"ep{index:03d}"
+    filename = f"ep{ep_num}-{clean_filename(ep['title'])}.mp3"
+    return EPISODES_DIR / filename
+
+def new_session() -> aiohttp.ClientSession:
+    """HTTP session with a bounded, keep-alive connection pool."""
+    connector = aiohttp.TCPConnector(limit=MAX_CONCURRENT_DOWNLOADS, limit_per_host=4, ttl_dns_cache=300)
+    # No total timeout: episodes are large, but stalled reads should still fail
+    timeout = aiohttp.ClientTimeout(total=None, sock_read=60)
+    return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+async def fetch_feed(session: aiohttp.ClientSession) -> list:
+    """Fetch and parse the RSS feed, reusing the cached parse on 304 Not Modified."""
+    cached = _read_json(FEED_CACHE_FILE)
+    headers = {}
+    if cached.get('episodes') is not None:
+        if cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+        if cached.get('last_modified'):
+            headers['If-Modified-Since'] = cached['last_modified']
+    
+    async with session.get(RSS_URL, headers=headers) as response:
+        if response.status == 304:
+            print("Feed not modified, using cached episode list")
+            return [dict(ep) for ep in cached['episodes']]
+        response.raise_for_status()
+        xml_content = await response.read()
+        feed_validators = validators(response)
+    
+    print("Parsing episodes...")
+    episodes = parse_rss(xml_content)
+    _write_json(FEED_CACHE_FILE, {**feed_validators, 'episodes': [dict(ep) for ep in episodes]})
+    return episodes
+
+async def fetch(session: aiohttp.ClientSession, ep: dict, index: int, sem: asyncio.Semaphore, state: dict) -> str:
+    """Stream a single episode MP3 to disk, resuming a partial download if possible."""
+    url = ep['audio_url']
+    filepath = episode_path(ep, index)
+    part_path = filepath.with_suffix('.part')
+    
+    # Resume with Range only if we know which version the partial file came from;
+    # If-Range makes the server send the full body instead if it has changed since.
+    headers = {}
+    cached = state.get(url, {})
+    offset = part_path.stat().st_size if part_path.exists() else 0
+    if offset and offset == cached.get('size'):
+        # Interrupted after the last byte but before the rename
+        part_path.replace(filepath)
+        return str(filepath)
+    if offset and (cached.get('etag') or cached.get('last_modified')):
+        headers['Range'] = f"bytes={offset}-"
+        headers['If-Range'] = cached.get('etag') or cached['last_modified']
+    
+    try:
+        async with sem:
+            resp = await session.get(url, headers=headers)
+            if resp.status == 416:
+                # The .part can't be resumed (e.g. it already holds the whole
+                # body but no size was recorded), so start over
+                resp.release()
+                part_path.unlink()
+                resp = await session.get(url)
+            async with resp:
+                resp.raise_for_status()
+                state[url] = validators(resp)
+                
+                if resp.status == 206:
+                    print(f"  Resuming at {offset} bytes: {filepath.name}")
+                    mode = 'ab'
+                else:
+                    print(f"  Downloading: {filepath.name}")
+                    mode = 'wb'
+                with open(part_path, mode) as f:
+                    async for chunk in resp.content.iter_chunked(CHUNK_SIZE):
+                        f.write(chunk)
+        # Only expose complete files under the final name
+        part_path.replace(filepath)
+        print(f"  Done: {filepath.name}")
+        return str(filepath)
+    except Exception as e:
+        print(f"  Error downloading {filepath.name}: {e}")
+        # Keep the validators for the .part so the next run can resume it
+        save_state(state)
+        return None
+
+async def download_all(session: aiohttp.ClientSession, episodes: list, state: dict, indices: list = None):
+    """Download episodes concurrently, setting ep['local_file'] on success.
+    
+    indices gives each episode's position in the feed (used for filenames of
+    unnumbered episodes); it defaults to 0..n-1.
+    """
+    sem = asyncio.Semaphore(MAX_CONCURRENT_DOWNLOADS)
+    pending = []
+    
+    for ep, index in zip(episodes, indices or range(len(episodes))):
+        if not ep['audio_url']:
+            continue
+        filepath = episode_path(ep, index)
+        if filepath.exists():
+            print(f"  Skipping (exists): {filepath.name}")
+            ep['local_file'] = str(filepath)
+            continue
+        pending.append((ep, index))
+    
+    results = await asyncio.gather(*(fetch(session, ep, index, sem, state) for ep, index in pending))
+    save_state(state)
+    for (ep, _), filepath in zip(pending, results):
+        if filepath:
+            ep['local_file'] = filepath
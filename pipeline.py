@@ -2,24 +2,39 @@
 """
 MLOps Podcast Pipeline: Transcribe → Tag → Analyze
 
-Processes episodes sequentially for reliability.
+Episodes flow through three overlapping stages (upload → transcribe → tag)
+connected by asyncio queues, each with its own concurrency limit.
 Uses Google Speech-to-Text (via GCS) and Gemini for analysis.
 """
 
 import os
+import re
+import sys
 import json
+import atexit
 import time
+import asyncio
+import sqlite3
+import traceback
+import shutil
 import subprocess
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from datetime import datetime
 
+import aiofiles
+
+from speedups import json_dumps, json_loads, run
+
 # Google Cloud clients
 from google.cloud import speech_v1p1beta1 as speech
 from google.cloud import storage
+from google.cloud.storage import transfer_manager
 
 # Vertex AI Gemini for tagging
 import vertexai
-from vertexai.generative_models import GenerativeModel
+from vertexai.generative_models import GenerationConfig, GenerativeModel
 
 # Paths
 EPISODES_DIR = Path("episodes")
@@ -28,36 +43,201 @@ TAGS_DIR = Path("tags")
 ANALYSIS_DIR = Path("analysis")
 METADATA_FILE = Path("episodes_metadata.json")
 PROGRESS_FILE = Path("pipeline_progress.json")
+DB_FILE = Path("episodes.db")
+
+# downloader.py names files "ep<number>-<title>.mp3"
+_RE_MP3_EPNUM = re.compile(r"ep(\d+)-")
 
 # Config
 GCP_PROJECT = "prj-cts-lab-vertex-sandbox"
 GCS_BUCKET = "mlops-podcast-audio"
 GCP_CREDENTIALS = "/home/jdgough/.openclaw/media/inbound/file_4---961897d5-1212-4747-bf78-cdf8829e5295.json"
 
+# Per-stage concurrency (Gemini is capped low to respect rate limits)
+UPLOAD_CONCURRENCY = 4
+TRANSCRIBE_CONCURRENCY = 8
+TAG_CONCURRENCY = 2
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+# Pipe ffmpeg straight into GCS instead of writing audio to disk first;
+# set False to go back to pre-converting files and uploading them
+STREAM_TO_GCS = True
+
+# Audio sent to Speech-to-Text (mono 16kHz). 12 kbps Opus is ~20x smaller
+# than FLAC; set "flac" to compare against the original lossless path.
+AUDIO_FORMAT = "opus"
+AUDIO_FORMATS = {
+    "opus": {
+        "ext": ".opus",
+        "codec_args": ["-c:a", "libopus", "-b:a", "12k", "-application", "voip"],
+        "muxer": "ogg",
+        "content_type": "audio/ogg",
+        "encoding": speech.RecognitionConfig.AudioEncoding.OGG_OPUS,
+    },
+    "flac": {
+        "ext": ".flac",
+        "codec_args": ["-c:a", "flac"],
+        "muxer": "flac",
+        "content_type": "audio/flac",
+        "encoding": speech.RecognitionConfig.AudioEncoding.FLAC,
+    },
+}
+
 # Set credentials
 os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = GCP_CREDENTIALS
 
 # Initialize Vertex AI
 vertexai.init(project=GCP_PROJECT, location="us-central1")
 
+# Shared clients, created on first use and reused across episodes so each
+# call doesn't set up a new gRPC channel and re-read credentials
+_MODEL = None
+_SPEECH = None
+_STORAGE = None
+_DB = None
+
+# save_progress debounce state
+PROGRESS_SAVE_INTERVAL = 30  # seconds
+_last_progress_save = float("-inf")
+_unsaved_progress = None
+
+
+def _model():
+    global _MODEL
+    _MODEL = _MODEL or GenerativeModel("gemini-2.0-flash-001", generation_config=TAG_GENERATION_CONFIG)
+    return _MODEL
+
+
+def _speech():
+    # Async gRPC channels bind to the running loop, so create this inside it
+    global _SPEECH
+    _SPEECH = _SPEECH or speech.SpeechAsyncClient()
+    return _SPEECH
+
+
+def _storage():
+    global _STORAGE
+    _STORAGE = _STORAGE or storage.Client(project=GCP_PROJECT)
+    return _STORAGE
+
+
+def _db():
+    """Open the episode store: one row per episode holding transcript and tags."""
+    global _DB
+    if _DB is None:
+        _DB = sqlite3.connect(DB_FILE)
+        _DB.execute("PRAGMA journal_mode=WAL")
+        _DB.execute(
+            "CREATE TABLE IF NOT EXISTS episodes ("
+            "base_name TEXT PRIMARY KEY, transcript TEXT, tags_json TEXT, updated_at INT)"
+        )
+    return _DB
+
+
+_DB_COLUMNS = {"transcript", "tags_json"}
+
+
+def store_episode(base_name: str, column: str, value: str):
+    """Insert or update one column ("transcript" or "tags_json") of an episode row."""
+    # The column name is interpolated into the SQL, so only allow known ones
+    if column not in _DB_COLUMNS:
+        raise ValueError(f"Unknown episode column: {column}")
+    with _db() as conn:
+        conn.execute(
+            f"INSERT INTO episodes (base_name, {column}, updated_at) VALUES (?, ?, ?) "
+            f"ON CONFLICT(base_name) DO UPDATE SET {column} = excluded.{column}, updated_at = excluded.updated_at",
+            (base_name, value, int(time.time())),
+        )
+
+
+def episode_state(base_name: str) -> tuple:
+    """Return (has_transcript, has_tags) for an episode."""
+    row = _db().execute(
+        "SELECT transcript IS NOT NULL, tags_json IS NOT NULL FROM episodes WHERE base_name = ?",
+        (base_name,),
+    ).fetchone()
+    return (bool(row[0]), bool(row[1])) if row else (False, False)
+
+
+def finished_episodes() -> set:
+    """Base names of episodes that have both a transcript and tags."""
+    return {r[0] for r in _db().execute(
+        "SELECT base_name FROM episodes WHERE transcript IS NOT NULL AND tags_json IS NOT NULL"
+    )}
+
+
+def load_transcript(base_name: str) -> str:
+    """Load a stored transcript."""
+    row = _db().execute("SELECT transcript FROM episodes WHERE base_name = ?", (base_name,)).fetchone()
+    return row[0] if row else None
+
+
+def sync_files_to_db():
+    """Reconcile the database with the transcripts/ and tags/ files.
+    
+    Files missing from the database are imported. Database entries whose file
+    has been deleted are cleared, so deleting a file still makes the pipeline
+    redo that step. Workers write the file before the row, so a row without a
+    file only happens when someone removed the file.
+    """
+    conn = _db()
+    imported = cleared = 0
+    for column, directory, suffix in (("transcript", TRANSCRIPTS_DIR, ".txt"), ("tags_json", TAGS_DIR, ".json")):
+        in_db = {r[0] for r in conn.execute(f"SELECT base_name FROM episodes WHERE {column} IS NOT NULL")}
+        on_disk = {f.stem: f for f in directory.glob(f"*{suffix}")}
+        
+        for base_name in on_disk.keys() - in_db:
+            store_episode(base_name, column, on_disk[base_name].read_text())
+            imported += 1
+        
+        missing = [(b,) for b in in_db - on_disk.keys()]
+        if missing:
+            with conn:
+                conn.executemany(f"UPDATE episodes SET {column} = NULL WHERE base_name = ?", missing)
+            cleared += len(missing)
+    
+    if imported:
+        print(f"  Imported {imported} files into {DB_FILE}")
+    if cleared:
+        print(f"  Cleared {cleared} entries whose files were deleted")
+
 
 def load_progress():
     """Load pipeline progress."""
     if PROGRESS_FILE.exists():
-        with open(PROGRESS_FILE) as f:
-            return json.load(f)
+        return json_loads(PROGRESS_FILE.read_bytes())
     return {"transcribed": [], "tagged": [], "started_at": datetime.now().isoformat()}
 
 
-def save_progress(progress):
-    """Save pipeline progress."""
-    with open(PROGRESS_FILE, "w") as f:
-        json.dump(progress, f, indent=2)
+def save_progress(progress, force=False):
+    """Save pipeline progress, at most once per PROGRESS_SAVE_INTERVAL.
+    
+    Writes go to a temp file that is renamed over the old one, so a crash
+    mid-write can't leave a truncated progress file.
+    """
+    global _last_progress_save, _unsaved_progress
+    _unsaved_progress = progress
+    if not force and time.monotonic() - _last_progress_save < PROGRESS_SAVE_INTERVAL:
+        return
+    
+    tmp = PROGRESS_FILE.with_suffix(".tmp")
+    tmp.write_bytes(json_dumps(progress))
+    os.replace(tmp, PROGRESS_FILE)
+    _last_progress_save = time.monotonic()
+    _unsaved_progress = None
+
+
+def flush_progress():
+    """Write any progress held back by save_progress's debounce."""
+    if _unsaved_progress is not None:
+        save_progress(_unsaved_progress, force=True)
+
+
+atexit.register(flush_progress)
 
 
 def ensure_bucket_exists():
     """Create GCS bucket if it doesn't exist."""
-    client = storage.Client(project=GCP_PROJECT)
+    client = _storage()
     try:
         bucket = client.get_bucket(GCS_BUCKET)
         print(f"  Using existing bucket: gs://{GCS_BUCKET}")
@@ -67,25 +247,45 @@ def ensure_bucket_exists():
     return bucket
 
 
-def convert_to_flac(mp3_path: Path) -> Path:
-    """Convert MP3 to FLAC for Speech-to-Text (mono, 16kHz)."""
-    flac_path = mp3_path.with_suffix(".flac")
-    if flac_path.exists():
-        return flac_path
-    
-    print(f"    Converting to FLAC (mono 16kHz)...")
-    cmd = [
+def ffmpeg_cmd(mp3_path: Path, output: str) -> list:
+    """ffmpeg command converting an MP3 to AUDIO_FORMAT for Speech-to-Text (mono, 16kHz)."""
+    fmt = AUDIO_FORMATS[AUDIO_FORMAT]
+    return [
         "ffmpeg", "-y", "-i", str(mp3_path),
         "-ac", "1",  # mono
         "-ar", "16000",  # 16kHz
-        "-c:a", "flac",
-        str(flac_path)
+        *fmt["codec_args"],
+        "-threads", "1",  # parallelism comes from running several at once
+        "-f", fmt["muxer"],
+        output,
     ]
+
+
+def convert_audio(mp3_path: Path) -> Path:
+    """Convert MP3 to AUDIO_FORMAT for Speech-to-Text (mono, 16kHz)."""
+    ext = AUDIO_FORMATS[AUDIO_FORMAT]["ext"]
+    audio_path = mp3_path.with_suffix(ext)
+    if audio_path.exists():
+        return audio_path
+    
+    # Write under a temp name so a killed run can't leave a truncated file
+    # that looks finished on restart
+    tmp_path = mp3_path.with_suffix(".part" + ext)
+    print(f"    Converting to {AUDIO_FORMAT} (mono 16kHz)...")
+    cmd = ffmpeg_cmd(mp3_path, str(tmp_path))
     result = subprocess.run(cmd, capture_output=True, text=True)
     if result.returncode != 0:
         print(f"    FFmpeg error: {result.stderr[:200]}")
+        tmp_path.unlink(missing_ok=True)
         return None
-    return flac_path
+    os.replace(tmp_path, audio_path)
+    return audio_path
+
+
+def preconvert_all(mp3_paths: list) -> dict:
+    """Convert MP3s in parallel, one ffmpeg per core."""
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as ex:
+        return dict(zip(mp3_paths, ex.map(convert_audio, mp3_paths)))
 
 
 def upload_to_gcs(local_path: Path, bucket) -> str:
@@ -98,6 +298,22 @@ def upload_to_gcs(local_path: Path, bucket) -> str:
         return f"gs://{GCS_BUCKET}/{blob_name}"
     
     print(f"    Uploading to GCS...")
+    # Upload 8 MiB parts over parallel streams (XML multipart upload); threads
+    # rather than processes since we're already inside the asyncio pipeline.
+    # Files that fit in one part (e.g. ~5 MB Opus episodes) go up in a single request.
+    if local_path.stat().st_size > UPLOAD_CHUNK_SIZE:
+        try:
+            transfer_manager.upload_chunks_concurrently(
+                str(local_path),
+                blob,
+                chunk_size=UPLOAD_CHUNK_SIZE,
+                max_workers=8,
+                worker_type=transfer_manager.THREAD,
+            )
+            return f"gs://{GCS_BUCKET}/{blob_name}"
+        except Exception as e:
+            print(f"    Parallel upload failed ({e}), falling back to single stream...")
+    
     # Use resumable upload with longer timeout for large files
     from google.cloud.storage import retry
     blob.upload_from_filename(
@@ -108,13 +324,51 @@ def upload_to_gcs(local_path: Path, bucket) -> str:
     return f"gs://{GCS_BUCKET}/{blob_name}"
 
 
-def transcribe_from_gcs(gcs_uri: str) -> str:
+def stream_to_gcs(mp3_path: Path, bucket) -> str:
+    """Convert MP3 and stream ffmpeg's output directly into GCS."""
+    fmt = AUDIO_FORMATS[AUDIO_FORMAT]
+    blob_name = f"audio/{mp3_path.stem}{fmt['ext']}"
+    blob = bucket.blob(blob_name)
+    
+    if blob.exists():
+        print(f"    Already in GCS: gs://{GCS_BUCKET}/{blob_name}")
+        return f"gs://{GCS_BUCKET}/{blob_name}"
+    
+    print(f"    Streaming {AUDIO_FORMAT} to GCS...")
+    proc = subprocess.Popen(
+        ffmpeg_cmd(mp3_path, "pipe:1"),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+    # Upload under a temporary name and rename only once ffmpeg has exited
+    # cleanly: an abandoned BlobWriter still finalises what it has buffered
+    # when it's garbage collected, so a failed stream must never target the
+    # real name. BlobWriter is used because it never seeks the source, which
+    # a pipe can't do (upload_from_file calls tell() on it).
+    tmp_blob = bucket.blob(f"{blob_name}.part")
+    writer = tmp_blob.open("wb", chunk_size=UPLOAD_CHUNK_SIZE, content_type=fmt["content_type"])
+    try:
+        shutil.copyfileobj(proc.stdout, writer, UPLOAD_CHUNK_SIZE)
+        writer.close()
+    finally:
+        # Closing our end also stops ffmpeg if the upload failed part way
+        proc.stdout.close()
+        returncode = proc.wait()
+    
+    if returncode != 0:
+        tmp_blob.delete()
+        raise RuntimeError(f"ffmpeg exited with code {returncode}")
+    bucket.rename_blob(tmp_blob, blob_name)
+    return f"gs://{GCS_BUCKET}/{blob_name}"
+
+
+async def transcribe_from_gcs(gcs_uri: str) -> str:
     """Transcribe audio from GCS using Speech-to-Text long-running API."""
-    client = speech.SpeechClient()
+    client = _speech()
     
     audio = speech.RecognitionAudio(uri=gcs_uri)
     config = speech.RecognitionConfig(
-        encoding=speech.RecognitionConfig.AudioEncoding.FLAC,
+        encoding=AUDIO_FORMATS[AUDIO_FORMAT]["encoding"],
         sample_rate_hertz=16000,
         language_code="en-US",
         enable_automatic_punctuation=True,
@@ -122,17 +376,16 @@ def transcribe_from_gcs(gcs_uri: str) -> str:
         use_enhanced=True,
     )
     
-    print(f"    Starting transcription (this takes a while)...")
-    operation = client.long_running_recognize(config=config, audio=audio)
+    operation = await client.long_running_recognize(config=config, audio=audio)
     
-    # Poll for completion with progress updates
-    start_time = time.time()
-    while not operation.done():
-        elapsed = int(time.time() - start_time)
-        print(f"    Transcribing... ({elapsed}s elapsed)", end="\r")
-        time.sleep(10)
+    # Poll for completion with geometric backoff (3s, 3.5s, 4.25s, ... capped
+    # at 60s): short clips finish promptly, long ones don't flood the API
+    n = 0
+    while not await operation.done():
+        await asyncio.sleep(min(60, 2 + 1.5 ** n))
+        n += 1
     
-    response = operation.result(timeout=1800)  # 30 min timeout
+    response = await operation.result(timeout=1800)  # 30 min timeout
     
     transcript = ""
     for result in response.results:
@@ -141,11 +394,9 @@ def transcribe_from_gcs(gcs_uri: str) -> str:
     return transcript.strip()
 
 
-def tag_episode(transcript: str, title: str) -> dict:
-    """Use Vertex AI Gemini to extract tags and themes from transcript."""
-    model = GenerativeModel("gemini-2.0-flash-001")
-    
-    prompt = f"""Analyze this podcast episode transcript and extract:
+TAG_TRANSCRIPT_CHARS = 10000
+
+TAG_PROMPT = """Analyze this podcast episode transcript and extract:
 
 1. **Technology Tags** (5-10 specific technologies, frameworks, or tools mentioned)
 2. **Business Tags** (3-5 business concepts, strategies, or themes)
@@ -155,178 +406,304 @@ def tag_episode(transcript: str, title: str) -> dict:
 
 Episode Title: {title}
 
-Transcript (first 10000 chars):
-{transcript[:10000]}
-
-Respond in valid JSON only (no markdown):
-{{
-    "tech_tags": ["tag1", "tag2"],
-    "business_tags": ["tag1", "tag2"],
-    "key_topics": ["topic1", "topic2"],
-    "guest": {{"name": "...", "role": "...", "company": "..."}},
-    "summary": "..."
-}}
+Transcript (first {max_chars} chars):
+{transcript}
 """
+
+# JSON mode: the model returns an object matching this schema, so there are
+# no markdown fences to strip
+TAG_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "tech_tags": {"type": "array", "items": {"type": "string"}},
+        "business_tags": {"type": "array", "items": {"type": "string"}},
+        "key_topics": {"type": "array", "items": {"type": "string"}},
+        "guest": {
+            "type": "object",
+            "properties": {
+                "name": {"type": "string"},
+                "role": {"type": "string"},
+                "company": {"type": "string"},
+            },
+        },
+        "summary": {"type": "string"},
+    },
+    "required": ["tech_tags", "business_tags", "key_topics", "guest", "summary"],
+}
+TAG_GENERATION_CONFIG = GenerationConfig(
+    response_mime_type="application/json",
+    response_schema=TAG_SCHEMA,
+)
+
+
+async def tag_episode(transcript: str, title: str) -> dict:
+    """Use Vertex AI Gemini to extract tags and themes from transcript."""
+    model = _model()
     
-    response = model.generate_content(prompt)
+    prompt = TAG_PROMPT.format_map({
+        "title": title,
+        "max_chars": TAG_TRANSCRIPT_CHARS,
+        "transcript": transcript[:TAG_TRANSCRIPT_CHARS],
+    })
     
-    # Parse JSON from response
-    text = response.text.strip()
-    # Remove markdown code blocks if present
-    if text.startswith("```"):
-        lines = text.split("\n")
-        text = "\n".join(lines[1:-1])
+    response = await model.generate_content_async(prompt)
+    text = response.text
     
     try:
-        return json.loads(text)
+        return json_loads(text)
     except json.JSONDecodeError:
         return {"error": "Failed to parse response", "raw": text[:500]}
 
 
-def process_episode(ep: dict, progress: dict, bucket) -> bool:
-    """Process a single episode through the pipeline."""
+def build_mp3_index() -> dict:
+    """Index the MP3s on disk once: by episode number, plus lowercased names."""
+    by_num = {}
+    names = []
+    for f in sorted(EPISODES_DIR.glob("*.mp3")):
+        m = _RE_MP3_EPNUM.match(f.name)
+        if m:
+            by_num.setdefault(m.group(1), f)
+        names.append((f.name.lower(), f))
+    return {"by_num": by_num, "names": names}
+
+
+def find_audio_file(ep: dict, mp3_index: dict) -> Path:
+    """Locate the episode's MP3 on disk."""
     title = ep.get("title", "Unknown")
     local_file = ep.get("local_file")
     
+    if not local_file and ep.get("episode_number"):
+        local_file = mp3_index["by_num"].get(ep["episode_number"])
+    
     if not local_file:
-        # Try to find the file
-        for f in EPISODES_DIR.glob("*.mp3"):
-            if any(word.lower() in f.name.lower() for word in title.split()[:3]):
-                local_file = str(f)
+        # Try to find the file by title words
+        words = [word.lower() for word in title.split()[:3]]
+        for name, f in mp3_index["names"]:
+            if any(word in name for word in words):
+                local_file = f
                 break
     
     if not local_file or not Path(local_file).exists():
-        print(f"  ⚠️  No audio file found")
-        return False
-    
-    mp3_path = Path(local_file)
-    base_name = mp3_path.stem
-    
-    # Step 1: Transcribe
-    transcript_file = TRANSCRIPTS_DIR / f"{base_name}.txt"
-    if transcript_file.exists():
-        print(f"  ✓ Transcript exists ({transcript_file.stat().st_size} bytes)")
-        transcript = transcript_file.read_text()
-    else:
-        print(f"  📝 Transcribing...")
-        
-        # Convert to FLAC
-        flac_path = convert_to_flac(mp3_path)
-        if not flac_path:
-            print(f"  ⚠️  Failed to convert to FLAC")
-            return False
-        
+        return None
+    return Path(local_file)
+
+
+async def upload_worker(upload_q: asyncio.Queue, transcribe_q: asyncio.Queue, bucket):
+    """Stage 1: convert audio (if not pre-converted) and upload to GCS."""
+    while True:
+        job = await upload_q.get()
+        job["audio_path"] = audio_path = None
         try:
-            # Upload to GCS
-            gcs_uri = upload_to_gcs(flac_path, bucket)
+            if STREAM_TO_GCS:
+                print(f"  ☁️  {job['label']} Uploading...")
+                job["gcs_uri"] = await asyncio.to_thread(stream_to_gcs, job["mp3_path"], bucket)
+                await transcribe_q.put(job)
+                continue
             
-            # Transcribe
-            transcript = transcribe_from_gcs(gcs_uri)
+            audio_path = await asyncio.to_thread(convert_audio, job["mp3_path"])
+            if not audio_path:
+                print(f"  ⚠️  {job['label']} Failed to convert audio")
+                continue
             
-            if not transcript:
-                print(f"  ⚠️  Empty transcript")
-                return False
+            print(f"  ☁️  {job['label']} Uploading...")
+            job["audio_path"] = audio_path
+            job["gcs_uri"] = await asyncio.to_thread(upload_to_gcs, audio_path, bucket)
+            await transcribe_q.put(job)
+        except Exception as e:
+            print(f"  ⚠️  {job['label']} Upload failed: {e}")
+            # Clean up converted audio
+            if audio_path and audio_path.exists():
+                audio_path.unlink()
+        finally:
+            upload_q.task_done()
+
+
+async def transcribe_worker(transcribe_q: asyncio.Queue, tag_q: asyncio.Queue, progress: dict):
+    """Stage 2: run long-running recognition and save the transcript."""
+    while True:
+        job = await transcribe_q.get()
+        try:
+            print(f"  📝 {job['label']} Transcribing (this takes a while)...")
+            start_time = time.time()
+            transcript = await transcribe_from_gcs(job["gcs_uri"])
             
-            transcript_file.write_text(transcript)
-            print(f"\n  ✓ Saved transcript ({len(transcript)} chars)")
+            if not transcript:
+                print(f"  ⚠️  {job['label']} Empty transcript")
+                continue
             
-            # Clean up FLAC to save space
-            if flac_path.exists():
-                flac_path.unlink()
+            # File first: a DB row must never exist without its file
+            async with aiofiles.open(job["transcript_file"], "w") as f:
+                await f.write(transcript)
+            store_episode(job["base_name"], "transcript", transcript)
+            elapsed = int(time.time() - start_time)
+            print(f"  ✓ {job['label']} Saved transcript ({len(transcript)} chars, {elapsed}s)")
             
-            progress["transcribed"].append(base_name)
+            progress["transcribed"].append(job["base_name"])
             save_progress(progress)
             
+            job["transcript"] = transcript
+            await tag_q.put(job)
         except Exception as e:
-            print(f"\n  ⚠️  Transcription failed: {e}")
-            # Clean up FLAC
-            if flac_path and flac_path.exists():
-                flac_path.unlink()
-            return False
-    
-    # Step 2: Tag
-    tags_file = TAGS_DIR / f"{base_name}.json"
-    if tags_file.exists():
-        print(f"  ✓ Tags exist")
-    else:
-        print(f"  🏷️  Extracting tags...")
+            print(f"  ⚠️  {job['label']} Transcription failed: {e}")
+        finally:
+            # Clean up converted audio to save space
+            if job["audio_path"] and job["audio_path"].exists():
+                job["audio_path"].unlink()
+            transcribe_q.task_done()
+
+
+async def tag_worker(tag_q: asyncio.Queue, progress: dict):
+    """Stage 3: extract tags with Gemini and save them."""
+    while True:
+        job = await tag_q.get()
         try:
-            tags = tag_episode(transcript, title)
-            with open(tags_file, "w") as f:
-                json.dump(tags, f, indent=2)
-            print(f"  ✓ Saved tags")
+            if episode_state(job["base_name"])[1]:
+                print(f"  ✓ {job['label']} Tags exist")
+                continue
+            
+            print(f"  🏷️  {job['label']} Extracting tags...")
+            tags = await tag_episode(job["transcript"], job["title"])
+            tags_json = json_dumps(tags)
+            async with aiofiles.open(job["tags_file"], "wb") as f:
+                await f.write(tags_json)
+            store_episode(job["base_name"], "tags_json", tags_json.decode())
+            print(f"  ✓ {job['label']} Saved tags")
             
-            progress["tagged"].append(base_name)
+            progress["tagged"].append(job["base_name"])
             save_progress(progress)
             
             # Rate limit for Gemini
-            time.sleep(2)
+            await asyncio.sleep(2)
+        except Exception as e:
+            print(f"  ⚠️  {job['label']} Tagging failed: {e}")
+        finally:
+            tag_q.task_done()
+
+
+async def run_pipeline(episodes: list, progress: dict, bucket, mp3_index: dict, done: set):
+    """Feed episodes through the upload → transcribe → tag stages, skipping those in done."""
+    upload_q = asyncio.Queue()
+    transcribe_q = asyncio.Queue()
+    tag_q = asyncio.Queue()
+    
+    workers = (
+        [asyncio.create_task(upload_worker(upload_q, transcribe_q, bucket)) for _ in range(UPLOAD_CONCURRENCY)]
+        + [asyncio.create_task(transcribe_worker(transcribe_q, tag_q, progress)) for _ in range(TRANSCRIBE_CONCURRENCY)]
+        + [asyncio.create_task(tag_worker(tag_q, progress)) for _ in range(TAG_CONCURRENCY)]
+    )
+    
+    queued = set()
+    for i, ep in enumerate(episodes):
+        title = ep.get("title", "Unknown")
+        label = f"[{i+1}/{len(episodes)}]"
+        print(f"\n{label} {title[:60]}...")
+        
+        if ep.get("local_file") and Path(ep["local_file"]).stem in done:
+            print(f"  ✓ Transcript and tags exist")
+            continue
+        
+        try:
+            mp3_path = find_audio_file(ep, mp3_index)
+            if not mp3_path:
+                print(f"  ⚠️  No audio file found")
+                continue
+            
+            base_name = mp3_path.stem
+            if base_name in queued:
+                print(f"  ✓ Already queued")
+                continue
+            queued.add(base_name)
+            
+            job = {
+                "label": label,
+                "title": title,
+                "mp3_path": mp3_path,
+                "base_name": base_name,
+                "transcript_file": TRANSCRIPTS_DIR / f"{base_name}.txt",
+                "tags_file": TAGS_DIR / f"{base_name}.json",
+            }
+            
+            has_transcript, has_tags = episode_state(base_name)
+            if not has_transcript:
+                await upload_q.put(job)
+                continue
+            
+            job["transcript"] = load_transcript(base_name)
+            print(f"  ✓ Transcript exists ({len(job['transcript'])} chars)")
+            if has_tags:
+                print(f"  ✓ Tags exist")
+                continue
+            
+            await tag_q.put(job)
         except Exception as e:
-            print(f"  ⚠️  Tagging failed: {e}")
+            print(f"  ❌ Error: {e}")
+            traceback.print_exc()
+    
+    # Each stage only feeds the next, so draining them in order drains everything
+    await upload_q.join()
+    await transcribe_q.join()
+    await tag_q.join()
     
-    return True
+    for w in workers:
+        w.cancel()
+    await asyncio.gather(*workers, return_exceptions=True)
+
+
+def _tag_key(tag: str) -> str:
+    """Normalised counting key for a tag.
+    
+    Tags come from a small vocabulary repeated across many episodes, so
+    interning makes every occurrence share one string object.
+    """
+    return sys.intern(tag.casefold())
 
 
 def build_analysis_index():
     """Build aggregated analysis from all tagged episodes."""
     print("\n📊 Building analysis index...")
     
-    all_tech_tags = {}
-    all_business_tags = {}
-    all_topics = {}
+    tech, business, topics = Counter(), Counter(), Counter()
     episodes_summary = []
     
-    for tags_file in TAGS_DIR.glob("*.json"):
-        with open(tags_file) as f:
-            data = json.load(f)
-        
+    rows = _db().execute(
+        "SELECT base_name, tags_json FROM episodes WHERE tags_json IS NOT NULL ORDER BY base_name"
+    )
+    for base_name, tags_json in rows:
+        data = json_loads(tags_json)
         if "error" in data:
             continue
         
-        # Count tech tags
-        for tag in data.get("tech_tags", []):
-            tag_lower = tag.lower()
-            all_tech_tags[tag_lower] = all_tech_tags.get(tag_lower, 0) + 1
-        
-        # Count business tags
-        for tag in data.get("business_tags", []):
-            tag_lower = tag.lower()
-            all_business_tags[tag_lower] = all_business_tags.get(tag_lower, 0) + 1
-        
-        # Count topics
-        for topic in data.get("key_topics", []):
-            topic_lower = topic.lower()
-            all_topics[topic_lower] = all_topics.get(topic_lower, 0) + 1
+        tech.update(_tag_key(t) for t in data.get("tech_tags", []))
+        business.update(_tag_key(t) for t in data.get("business_tags", []))
+        topics.update(_tag_key(t) for t in data.get("key_topics", []))
         
         episodes_summary.append({
-            "file": tags_file.stem,
+            "file": base_name,
             "summary": data.get("summary", ""),
             "guest": data.get("guest", {}),
             "tech_tags": data.get("tech_tags", []),
         })
     
-    # Sort by frequency
-    tech_sorted = sorted(all_tech_tags.items(), key=lambda x: -x[1])
-    business_sorted = sorted(all_business_tags.items(), key=lambda x: -x[1])
-    topics_sorted = sorted(all_topics.items(), key=lambda x: -x[1])
+    # Top-k by frequency
+    top_tech = tech.most_common(25)
+    top_business = business.most_common(20)
     
     analysis = {
         "generated_at": datetime.now().isoformat(),
         "episodes_analyzed": len(episodes_summary),
-        "top_tech_themes": tech_sorted[:25],
-        "top_business_themes": business_sorted[:20],
-        "top_topics": topics_sorted[:20],
+        "top_tech_themes": top_tech,
+        "top_business_themes": top_business,
+        "top_topics": topics.most_common(20),
         "episodes": episodes_summary,
     }
     
-    with open(ANALYSIS_DIR / "index.json", "w") as f:
-        json.dump(analysis, f, indent=2)
+    (ANALYSIS_DIR / "index.json").write_bytes(json_dumps(analysis))
     
     print(f"  ✓ Analyzed {len(episodes_summary)} episodes")
-    if tech_sorted:
-        print(f"  Top tech themes: {[t[0] for t in tech_sorted[:5]]}")
-    if business_sorted:
-        print(f"  Top business themes: {[t[0] for t in business_sorted[:5]]}")
+    if top_tech:
+        print(f"  Top tech themes: {[t[0] for t in top_tech[:5]]}")
+    if top_business:
+        print(f"  Top business themes: {[t[0] for t in top_business[:5]]}")
     
     return analysis
 
@@ -341,13 +718,15 @@ def main():
         print("❌ No episodes metadata found. Run download_episodes.py first.")
         return
     
-    with open(METADATA_FILE) as f:
-        episodes = json.load(f)
+    episodes = json_loads(METADATA_FILE.read_bytes())
     
     print(f"🎙️  MLOps Podcast Pipeline")
     print(f"   Episodes to process: {len(episodes)}")
     print(f"   GCS Bucket: gs://{GCS_BUCKET}")
-    print(f"   Output: transcripts/, tags/, analysis/\n")
+    print(f"   Output: {DB_FILE}, transcripts/, tags/, analysis/\n")
+    
+    # Bring the episode store in line with transcripts/ and tags/
+    sync_files_to_db()
     
     # Ensure GCS bucket exists
     bucket = ensure_bucket_exists()
@@ -355,28 +734,36 @@ def main():
     # Load progress
     progress = load_progress()
     
-    # Process each episode sequentially
-    for i, ep in enumerate(episodes):
-        title = ep.get("title", "Unknown")[:60]
-        print(f"\n[{i+1}/{len(episodes)}] {title}...")
-        
-        try:
-            process_episode(ep, progress, bucket)
-        except Exception as e:
-            print(f"  ❌ Error: {e}")
-            import traceback
-            traceback.print_exc()
-            continue
-        
-        # Small delay between episodes
-        time.sleep(1)
+    # One directory scan for every episode's MP3 lookup
+    mp3_index = build_mp3_index()
+    
+    # Fully processed episodes, looked up once so warm re-runs skip the MP3 search
+    done = finished_episodes()
+    
+    # Convert every untranscribed episode up front so ffmpeg uses all cores
+    # (when streaming, conversion happens inside the upload stage instead)
+    if not STREAM_TO_GCS:
+        pending = []
+        for ep in episodes:
+            if ep.get("local_file") and Path(ep["local_file"]).stem in done:
+                continue
+            mp3_path = find_audio_file(ep, mp3_index)
+            if mp3_path and mp3_path not in pending and not episode_state(mp3_path.stem)[0]:
+                pending.append(mp3_path)
+        if pending:
+            print(f"🎛️  Converting {len(pending)} episodes to {AUDIO_FORMAT}...")
+            preconvert_all(pending)
+    
+    # Upload, transcribe, and tag with the stages overlapping across episodes
+    run(run_pipeline(episodes, progress, bucket, mp3_index, done))
     
     # Build analysis index
     build_analysis_index()
     
     print("\n✅ Pipeline complete!")
-    print(f"   Transcripts: {len(list(TRANSCRIPTS_DIR.glob('*.txt')))}")
-    print(f"   Tagged: {len(list(TAGS_DIR.glob('*.json')))}")
+    n_transcripts, n_tagged = _db().execute("SELECT COUNT(transcript), COUNT(tags_json) FROM episodes").fetchone()
+    print(f"   Transcripts: {n_transcripts}")
+    print(f"   Tagged: {n_tagged}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,36 @@
+"""Optional speedups shared by the download and pipeline scripts."""
+
+import sys
+import json
+import asyncio
+
+# orjson is several times faster than the stdlib when it's installed
+try:
+    import orjson
+
+    def json_dumps(obj) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+
+    json_loads = orjson.loads
+except ImportError:
+    def json_dumps(obj) -> bytes:
+        return json.dumps(obj, indent=2).encode()
+
+    json_loads = json.loads
+
+# uvloop is a faster event loop when it's installed
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+
+def run(main):
+    """asyncio.run(main), on uvloop when available."""
+    if uvloop is None:
+        return asyncio.run(main)
+    if sys.version_info >= (3, 12):
+        return asyncio.run(main, loop_factory=uvloop.new_event_loop)
+    # Older Pythons have no loop_factory; fall back to installing the policy
+    uvloop.install()
+    return asyncio.run(main)